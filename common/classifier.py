@@ -0,0 +1,83 @@
+import re
+import sys
+import common.http_client as http_client
+
+MATRIX_QUERIES = ['dna sequence', 'dna secondary structure', 'dna structure', 'genomics', 'rna sequence', 'rna secondary structure', 'rna structure', 'rna omics', 'protein sequence', 'protein secondary structure', 'protein structure', 'protein omics', 'small molecule primary sequence', 'small molecule secondary structure', 'small molecule structure', 'small molecule omics']
+DATA_CYCLE_QUERIES = ['acquisition', 'data processing', 'analysis', 'storage', 'share', 'data management', 'fair']
+
+# Checked in order, the first matching suffix is replaced. Singular, plural and verb forms fold to one stem:
+# analysis/analyses/analysed -> analys, sequence/sequences/sequencing -> sequenc, structure/structures -> structur.
+SUFFIXES = [('ysis', 'ys'), ('yses', 'ys'), ('ies', 'y'), ('ing', ''), ('ed', ''), ('es', ''), ('e', ''), ('s', '')]
+
+def normalize(token):
+    for suffix, replacement in SUFFIXES:
+        if not token.endswith(suffix):
+            continue
+        if suffix == 's' and token.endswith('ss'):
+            return token
+        stem = token[:-len(suffix)] + replacement
+        return stem if len(stem) >= 3 else token
+    return token
+
+def get_tokens(text):
+    return {normalize(token) for token in re.findall(r'[a-z0-9]+', text.lower())}
+
+def get_searchable_text(item):
+    texts = [item.get('biotoolsID'), item.get('name'), item.get('description')]
+    texts += [topic['term'] for topic in item.get('topic') or []]
+    for function in item.get('function') or []:
+        texts += [operation['term'] for operation in function.get('operation') or []]
+        for data in (function.get('input') or []) + (function.get('output') or []):
+            texts.append(data['data']['term'])
+            texts += [data_format['term'] for data_format in data.get('format') or []]
+        texts.append(function.get('note'))
+    return ' '.join(text for text in texts if text)
+
+def matches(tokens, query):
+    return all(normalize(word) in tokens for word in query.split())
+
+def classify(item):
+    # Local equivalent of searching bio.tools with q=<query>&biotoolsID=<id> for every matrix and data cycle query:
+    # a query matches when all of its words occur in the tool document.
+    tokens = get_tokens(get_searchable_text(item))
+    matrix_queries = [query for query in MATRIX_QUERIES if matches(tokens, query)]
+    data_cycle_queries = [query for query in DATA_CYCLE_QUERIES if matches(tokens, query)]
+    return matrix_queries, data_cycle_queries
+
+def search_api(id, query):
+    response = http_client.get(f'https://bio.tools/api/tool/?page=1&q={query}&biotoolsID=\"{id}\"&format=json', cache=False)
+    if not response.ok:
+        return None
+    return response.json()['count'] > 0
+
+def classify_with_api(item):
+    # The 23 bio.tools searches the local classification replaces, None if one of them failed.
+    results = {query: search_api(item['biotoolsID'], query) for query in MATRIX_QUERIES + DATA_CYCLE_QUERIES}
+    if None in results.values():
+        return None
+    return [query for query in MATRIX_QUERIES if results[query]], [query for query in DATA_CYCLE_QUERIES if results[query]]
+
+def compare_with_api(items):
+    # Checks the local classification of a sample of tools against the bio.tools search it replaces.
+    checked = 0
+    mismatches = []
+    for item in items:
+        matrix_queries, data_cycle_queries = classify(item)
+        local = set(matrix_queries + data_cycle_queries)
+        for query in MATRIX_QUERIES + DATA_CYCLE_QUERIES:
+            api = search_api(item['biotoolsID'], query)
+            if api is None:
+                continue
+            checked += 1
+            if api != (query in local):
+                mismatches.append((item['biotoolsID'], query, query in local, api))
+    return checked, mismatches
+
+if __name__ == "__main__":
+    # python -m common.classifier <bio_id> <bio_id> ...
+    from common.common_functions import get_items_from_list
+    items = [item for item in get_items_from_list(sys.argv[1:]) if item]
+    checked, mismatches = compare_with_api(items)
+    for id, query, local, api in mismatches:
+        print(f'MISMATCH {id} "{query}" LOCAL: {local} API: {api}')
+    print(f'AGREEMENT {checked - len(mismatches)}/{checked}')
@@ -1,13 +1,94 @@
-import requests
 import json
+import gzip
+import hashlib
+import math
+from collections import deque, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy import select
+from sqlalchemy import select, update
+from sqlalchemy.dialects.mysql import insert
 import common.db as db
+import common.query_cache as query_cache
+import common.http_client as http_client
+import common.github as github
+import common.openebench as openebench
+from common.classifier import MATRIX_QUERIES, DATA_CYCLE_QUERIES, classify, classify_with_api
 import os
+from datetime import date, datetime, timezone
 from dotenv import load_dotenv
+try:
+    import brotli
+except ImportError:
+    brotli = None
 
 load_dotenv()
 Session = sessionmaker(bind=db.engine, autoflush=False)
+BIOTOOLS_PAGE_CONCURRENCY = int(os.getenv('BIOTOOLS_PAGE_CONCURRENCY', 4))
+PREFETCH_BATCH = int(os.getenv('PREFETCH_BATCH', 100))
+MATERIALIZE_CHUNK = int(os.getenv('MATERIALIZE_CHUNK', 1000))
+# Lists of data_for_frontend, in the order they are serialized after 'functions'.
+TOOL_LIST_TABLES = [db.matrix_queries, db.data_cycle_queries, db.publications, db.topics, db.institutes, db.platforms, db.tool_types, db.collection_ids, db.documentations, db.elixir_platforms, db.elixir_nodes, db.elixir_communities]
+BROTLI_QUALITY = int(os.getenv('BROTLI_QUALITY', 11))
+# The local classifier (common/classifier.py) is only used once LOCAL_CLASSIFIER=1 is set, until then
+# every tool is classified with the bio.tools searches. Check the agreement first with python -m common.classifier.
+LOCAL_CLASSIFIER = os.getenv('LOCAL_CLASSIFIER', '0') == '1'
+ENRICHMENT_WORKERS = db.ENRICHMENT_WORKERS
+# Shared by every tool of an import or update run, so one slow upstream only ties up a single worker.
+enrichment_pool = ThreadPoolExecutor(max_workers=ENRICHMENT_WORKERS)
+
+def fetch_biotools_page(page, coll_id, topic):
+    response = http_client.get(f'https://bio.tools/api/tool/?page={page}{coll_id}{topic}&format=json')
+    if not response.ok:
+        return None
+    return response.json()
+
+def fetch_biotools_pages(coll_id, topic):
+    # Pages are downloaded by a bounded pool while the caller processes earlier ones,
+    # but they are always yielded in page order. A failed page is yielded as None.
+    response = http_client.get(f'https://bio.tools/api/tool/?{coll_id}{topic}&format=json')
+    if not response.ok:
+        yield None
+        return
+    response = response.json()
+    yield response
+    count = math.ceil(response['count'] / 10) + 1
+    pages = iter(range(2, count))
+    with ThreadPoolExecutor(max_workers=BIOTOOLS_PAGE_CONCURRENCY) as executor:
+        pending = deque(executor.submit(fetch_biotools_page, page, coll_id, topic) for page in islice(pages, BIOTOOLS_PAGE_CONCURRENCY))
+        while pending:
+            response = pending.popleft().result()
+            for page in islice(pages, 1):
+                pending.append(executor.submit(fetch_biotools_page, page, coll_id, topic))
+            yield response
+
+def get_items_from_pages(coll_id, topic):
+    for response in fetch_biotools_pages(coll_id, topic):
+        if not response:
+            yield None
+            return
+        yield from response['list']
+
+def get_items_from_list(split_list):
+    for t in split_list:
+        response = http_client.get(f'https://bio.tools/api/tool/?&biotoolsID=\"{t}\"&format=json')
+        if not response.ok:
+            yield None
+            return
+        response = response.json()
+        if not response['list']:
+            continue
+        yield response['list'][0]
+
+def get_chunks(items, size):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
 
 def update_version(versions):
     if not versions:
@@ -16,74 +97,53 @@ def update_version(versions):
         return versions[0]
     return "v" + versions[0]
 
-def update_availability(id):
+def update_availability(id, availabilities=None):
+    # availabilities holds the values prefetched by openebench.prefetch_availability.
+    if availabilities and id in availabilities:
+        return availabilities[id]
     try:
-        response = requests.get(f"https://openebench.bsc.es/monitor/rest/aggregate?id={id.lower()}", timeout=5)
-        response.raise_for_status()
-        response = response.json()
-        if not response or "entities" not in response[0]:
-            return None
-        entities = response[0]["entities"]
-        link = ""
-        for entity in entities:
-            if entity["type"] == "web":
-                link = entity["tools"][-1]["@id"]
-                break
-            elif entity["type"]:
-                link = entity["tools"][-1]["@id"]
+        link = openebench.get_link(id)
         if not link:
             return None
-        split_link = link.split("/")
-        response = requests.get(
-            f"https://openebench.bsc.es/monitor/rest/homepage/{split_link[-3]}/{split_link[-2]}/{split_link[-1]}?limit=8"
-        )
-        response.raise_for_status()
-        response = response.json()
-        codes_200 = 0
-        for item in response:
-            if item["code"] == 200:
-                codes_200 += 1
-        return str(round(100 * (codes_200 / 8)))
+        return openebench.fetch_availability(link)
     except Exception as e:
         print(f'ERROR IN UPDATE AVAILABILITY {repr(e)}')
         return None
 
-def update_github_info(link):
+def parse_date(value):
+    # GitHub timestamps and Dimensions dates start with YYYY-MM-DD, anything else is stored as NULL.
     try:
-        github_url = ""
-        for item in link:
-            if "Repository" in item["type"] and "github" in item["url"]:
-                github_url = item["url"]
-                break
-        if not github_url:
-            return None, None, None, None, None, None
-        github_url = github_url[:-1] if github_url[-1] == "/" else github_url
-        owner_and_repo = github_url.split("/")[-2:]
-        if owner_and_repo[0] == 'github.com':
-            return None, None, None, None, None, None
-        headers = {'Authorization': 'token ' + os.getenv('GITHUB_TOKEN')}
-        response = requests.get(
-            f"https://api.github.com/repos/{owner_and_repo[0]}/{owner_and_repo[1]}",
-            headers=headers
-        )
-        if not response.ok:
+        return date.fromisoformat(value[:10])
+    except (TypeError, ValueError):
+        return None
+
+def update_github_info(link, repositories=None):
+    # repositories holds the stats prefetched by github.prefetch_repositories, missing ones are fetched over REST.
+    try:
+        repository = github.get_repository(link)
+        if not repository:
             return None, None, None, None, None, None
-        response = response.json()
-        if "message" in response:
-            return github_url, None, None, None, None, None
-        created_at = (
-            "" if "created_at" not in response else response["created_at"].split("T")[0]
-        )
-        updated_at = (
-            "" if "updated_at" not in response else response["updated_at"].split("T")[0]
-        )
-        forks = 0 if "forks" not in response else response["forks"]
-        stars = 0 if "stargazers_count" not in response else response["stargazers_count"]
-        headers = {'Authorization': 'token ' + os.getenv('GITHUB_TOKEN')}
-        response = requests.get(
-            f"https://api.github.com/repos/{owner_and_repo[0]}/{owner_and_repo[1]}/contributors",
-            headers=headers
-        )
+        github_url, owner_and_repo = repository
+        if repositories and owner_and_repo in repositories:
+            response = repositories[owner_and_repo]
+            if not response:
+                return None, None, None, None, None, None
+            created_at = parse_date(response["createdAt"])
+            updated_at = parse_date(response["updatedAt"])
+            forks = response["forkCount"]
+            stars = response["stargazerCount"]
+        else:
+            response = github.get(f"{github.GITHUB_API_URL}/repos/{owner_and_repo[0]}/{owner_and_repo[1]}")
+            if not response.ok:
+                return None, None, None, None, None, None
+            response = response.json()
+            if "message" in response:
+                return github_url, None, None, None, None, None
+            created_at = parse_date(response.get("created_at"))
+            updated_at = parse_date(response.get("updated_at"))
+            forks = 0 if "forks" not in response else response["forks"]
+            stars = 0 if "stargazers_count" not in response else response["stargazers_count"]
+        response = github.get(f"{github.GITHUB_API_URL}/repos/{owner_and_repo[0]}/{owner_and_repo[1]}/contributors")
         if not response.ok:
             return (
                 None, None, None, None, None, None
@@ -100,22 +160,24 @@ def update_github_info(link):
 
 def get_years_for_graphs(doi):
     try:
-        response = requests.get(f"https://badge.dimensions.ai/details/doi/{doi}/cited_works.json?domain=https://bio.tools")
+        response = http_client.get(f"https://badge.dimensions.ai/details/doi/{doi}/cited_works.json?domain=https://bio.tools", cache=False)
         if not response.ok:
             return
-        response = response.json()
-        years_list = [] if 'years' not in response else response['years']
-        if not years_list:
-            return
-        result = {}
-        for year in years_list:
-            count, id = year['count'], year['id']
-            result[id] = count
-        return result
+        return get_years_from_cited_works(response.json())
     except Exception as e:
         print(f'ERROR IN GET YEARS FOR GRAPHS {repr(e)}')
         return None
 
+def get_years_from_cited_works(response):
+    years_list = [] if 'years' not in response else response['years']
+    if not years_list:
+        return
+    result = {}
+    for year in years_list:
+        count, id = year['count'], year['id']
+        result[id] = count
+    return result
+
 
 def create_options_for_graphs(tool_name, years_for_graphs):
     if not years_for_graphs:
@@ -202,104 +264,205 @@ def create_display_string(coll_id, topic):
         return f'All tools about the {topic} topic'
     return 'All tools from a custom query'
 
-def get_data_for_functions(tool):
-    with Session() as session:
+def get_rows_by_key(session, table, column, keys):
+    # One chunked IN query per table for a whole set of tools. Rows come back in primary key order,
+    # which is the order the former per-tool SELECTs returned them in. IN matches case-insensitively under the
+    # MySQL collation, so the rows are grouped by the lowercased key and looked up the same way.
+    result = defaultdict(list)
+    for start in range(0, len(keys), MATERIALIZE_CHUNK):
+        query = select(table).where(column.in_(keys[start:start + MATERIALIZE_CHUNK])).order_by(*table.__table__.primary_key.columns)
+        for item in session.scalars(query):
+            result[getattr(item, column.key).lower()].append(item)
+    return result
+
+def materialize_tools(session, tools):
+    bio_ids = [tool.bio_id for tool in tools]
+    lists = {table: get_rows_by_key(session, table, table.bio_id, bio_ids) for table in TOOL_LIST_TABLES}
+    functions = get_rows_by_key(session, db.functions, db.functions.bio_id, bio_ids)
+    function_ids = [function.function_id for items in functions.values() for function in items]
+    operations = get_rows_by_key(session, db.operations, db.operations.function_id, function_ids)
+    inputs = get_rows_by_key(session, db.inputs, db.inputs.function_id, function_ids)
+    outputs = get_rows_by_key(session, db.outputs, db.outputs.function_id, function_ids)
+    result = []
+    for tool in tools:
         functions_list = []
-        functions = session.scalars(select(db.functions).where(db.functions.bio_id == tool.bio_id))
-        for function in functions:
-            operations_list = []
-            operations = session.scalars(select(db.operations).where(db.operations.function_id == function.function_id))
-            for o in operations:
-                operations_list.append(o.serialize())
-            inputs_list = []
-            inputs = session.scalars(select(db.inputs).where(db.inputs.function_id == function.function_id))
-            for i in inputs:
-                inputs_list.append(i.serialize())
-            outputs_list = []
-            outputs = session.scalars(select(db.outputs).where(db.outputs.function_id == function.function_id))
-            for o in outputs:
-                outputs_list.append(o.serialize())
+        for function in functions[tool.bio_id.lower()]:
             data_for_frontend = {}
-            data_for_frontend['operations'] = operations_list
-            data_for_frontend['inputs'] = inputs_list
-            data_for_frontend['outputs'] = outputs_list
-            json_data = json.dumps(data_for_frontend)
-            function.data_for_frontend = json_data.encode()
+            data_for_frontend['operations'] = [o.serialize() for o in operations[function.function_id.lower()]]
+            data_for_frontend['inputs'] = [i.serialize() for i in inputs[function.function_id.lower()]]
+            data_for_frontend['outputs'] = [o.serialize() for o in outputs[function.function_id.lower()]]
+            function.data_for_frontend = json.dumps(data_for_frontend).encode()
             functions_list.append(function.serialize())
-    return functions_list
+        data_for_frontend = {}
+        data_for_frontend['functions'] = functions_list
+        for table in TOOL_LIST_TABLES:
+            data_for_frontend[table.__tablename__] = [item.serialize() for item in lists[table][tool.bio_id.lower()]]
+        tool.data_for_frontend = json.dumps(data_for_frontend).encode()
+        result.append(tool.serialize())
+    return result
 
-def get_data_from_tables(tool, tables):
+def add_queries_matrix_data_cycle_from_items(items):
+    # Tools are classified concurrently, locally from the downloaded documents with LOCAL_CLASSIFIER,
+    # otherwise with the bio.tools searches. Tools whose searches failed are skipped.
+    ids = [item['biotoolsID'] for item in items]
+    if not ids:
+        return
+    classifications = list(enrichment_pool.map(classify if LOCAL_CLASSIFIER else classify_with_api, items))
     with Session() as session:
-        result = {}
-        for table in tables:
-            query = select(table).where(table.bio_id == tool.bio_id)
-            result[table.__tablename__] = [item.serialize() for item in session.scalars(query)]
+        existing_matrix_queries = {tuple(row) for row in session.execute(select(db.matrix_queries.bio_id, db.matrix_queries.matrix_query).where(db.matrix_queries.bio_id.in_(ids)))}
+        existing_data_cycle_queries = {tuple(row) for row in session.execute(select(db.data_cycle_queries.bio_id, db.data_cycle_queries.data_cycle_query).where(db.data_cycle_queries.bio_id.in_(ids)))}
+        changed_ids = set()
+        for item, classification in zip(items, classifications):
+            if not classification:
+                continue
+            id = item['biotoolsID']
+            matrix_queries, data_cycle_queries = classification
+            for query in matrix_queries:
+                if (id, query) in existing_matrix_queries:
+                    continue
+                existing_matrix_queries.add((id, query))
+                session.add(db.matrix_queries(bio_id=id, matrix_query=query))
+                changed_ids.add(id)
+            for query in data_cycle_queries:
+                if (id, query) in existing_data_cycle_queries:
+                    continue
+                existing_data_cycle_queries.add((id, query))
+                session.add(db.data_cycle_queries(bio_id=id, data_cycle_query=query))
+                changed_ids.add(id)
+        try:
+            session.commit()
+        except Exception as e:
+            print(f'ROLLING BACK IN MATRIX QUERIES {repr(e)}')
+            session.rollback()
+    mark_fragments_dirty(list(changed_ids))
+
+def get_data_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+def compress_data(data):
+    return gzip.compress(data, compresslevel=9, mtime=0), None if not brotli else brotli.compress(data, quality=BROTLI_QUALITY)
+
+def store_query_data(query, data, data_v2):
+    # The compressed variants are built once here, /data only picks one of them.
+    query.data = data
+    query.data_hash = get_data_hash(data)
+    # UTC, sent as Last-Modified by /data.
+    query.data_updated_at = datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+    query.data_gzip, query.data_br = compress_data(data)
+    query.data_v2 = data_v2
+    query.data_v2_gzip, query.data_v2_br = compress_data(data_v2)
+    query_cache.invalidate(query.id)
+
+def mark_fragments_dirty(ids):
+    # Called by every writer of tool data after its commit, the next query rebuild then materializes these tools again.
+    # Tools without a fragment get a dirty one, so a rebuild that read their old data cannot store it as clean.
+    if not ids:
+        return
+    with Session() as session:
+        try:
+            for start in range(0, len(ids), MATERIALIZE_CHUNK):
+                statement = insert(db.tool_fragments).values([{'bio_id': id, 'dirty': True} for id in ids[start:start + MATERIALIZE_CHUNK]])
+                session.execute(statement.on_duplicate_key_update(dirty=True, generation=db.tool_fragments.generation + 1))
+            session.commit()
+        except Exception as e:
+            print(f'ROLLING BACK IN MARK FRAGMENTS DIRTY {repr(e)}')
+            session.rollback()
+
+def get_tool_fragments(session, bio_ids):
+    # Serialized tools are kept in tool_fragments, only dirty tools and tools without a fragment are loaded and materialized.
+    # The generations are read in the session the tools come from, so they are at least as old as the materialized data.
+    # A rebuilt fragment is only stored while its generation is unchanged, a tool written meanwhile stays dirty.
+    bio_ids = list(dict.fromkeys(bio_ids))
+    stored = {}
+    columns = [db.tool_fragments.bio_id, db.tool_fragments.data, db.tool_fragments.data_hash, db.tool_fragments.dirty, db.tool_fragments.generation]
+    for start in range(0, len(bio_ids), MATERIALIZE_CHUNK):
+        for row in session.execute(select(*columns).where(db.tool_fragments.bio_id.in_(bio_ids[start:start + MATERIALIZE_CHUNK]))):
+            stored[row.bio_id.lower()] = row
+    result = {id: stored[id.lower()].data for id in bio_ids if id.lower() in stored and not stored[id.lower()].dirty}
+    stale = [id for id in bio_ids if id not in result]
+    print(f'REBUILDING {len(stale)} OF {len(bio_ids)} TOOL FRAGMENTS')
+    tools = get_rows_by_key(session, db.tools, db.tools.bio_id, stale)
+    with Session() as fragments_session:
+        for tool in materialize_tools(session, [tools[id.lower()][0] for id in stale if tools[id.lower()]]):
+            id = tool['bio_id']
+            data = json.dumps(tool).encode()
+            data_hash = get_data_hash(data)
+            result[id] = data
+            fragment = stored.get(id.lower())
+            if fragment:
+                values = {'dirty': False} if data_hash == fragment.data_hash else {'data': data, 'data_hash': data_hash, 'dirty': False}
+                # An unchanged tool only gets its flag cleared, the stored fragment is not rewritten.
+                fragments_session.execute(update(db.tool_fragments).where(db.tool_fragments.bio_id == fragment.bio_id, db.tool_fragments.generation == fragment.generation).values(**values))
+            else:
+                # Ignored if mark_fragments_dirty or another rebuild created the fragment meanwhile.
+                fragments_session.execute(insert(db.tool_fragments).prefix_with('IGNORE').values(bio_id=id, data=data, data_hash=data_hash, dirty=False))
+        try:
+            fragments_session.commit()
+        except Exception as e:
+            print(f'ROLLING BACK IN TOOL FRAGMENTS {repr(e)}')
+            fragments_session.rollback()
     return result
 
-def get_lists_for_tool(tool):
-    tables = [db.publications, db.matrix_queries, db.data_cycle_queries, db.topics, db.institutes, db.platforms, db.tool_types, db.collection_ids, db.documentations, db.elixir_platforms, db.elixir_nodes, db.elixir_communities]
-    data = get_data_from_tables(tool, tables)
-    data_for_frontend = {}
-    data_for_frontend['functions'] = get_data_for_functions(tool)
-    data_for_frontend['matrix_queries'] = data['matrix_queries']
-    data_for_frontend['data_cycle_queries'] = data['data_cycle_queries']
-    data_for_frontend['publications'] = data['publications']
-    data_for_frontend['topics'] =  data['topics']
-    data_for_frontend['institutes'] = data['institutes']
-    data_for_frontend['platforms'] = data['platforms']
-    data_for_frontend['tool_types'] = data['tool_types']
-    data_for_frontend['collection_ids'] = data['collection_ids']
-    data_for_frontend['documentations'] = data['documentations']
-    data_for_frontend['elixir_platforms'] = data['elixir_platforms']
-    data_for_frontend['elixir_nodes'] = data['elixir_nodes']
-    data_for_frontend['elixir_communities'] = data['elixir_communities']
-    json_data = json.dumps(data_for_frontend)
-    tool.data_for_frontend = json_data.encode()
+def separate_tools_by_queries(session, bio_ids, table, column, queries):
+    # Bio_ids of the tools per query, in the order of queries and tools.
+    rows = get_rows_by_key(session, table, table.bio_id, bio_ids)
+    separated_tools = {query: [] for query in queries}
+    for id in bio_ids:
+        for row in rows[id.lower()]:
+            separated_tools[getattr(row, column)].append(id)
+    return list(separated_tools.values())
 
-def separate_tools_by_matrix_queries(serialized_tools):
-    separated_tools = {"dna sequence": [], "dna secondary structure": [], "dna structure": [], "genomics": [], "rna sequence": [], "rna secondary structure": [], "rna structure": [], "rna omics": [], "protein sequence": [], "protein secondary structure": [], "protein structure": [], "protein omics": [], "small molecule primary sequence": [], "small molecule secondary structure": [], "small molecule structure": [], "small molecule omics": []}
-    for tool in serialized_tools:
-        for matrix_query in tool['data_for_frontend']['matrix_queries']:
-            separated_tools[matrix_query['matrix_query']].append(tool)
-    result = []
-    result_sizes = []
-    for value in separated_tools.values():
-        result.append(value)
-        result_sizes.append(len(value))
-    return result, result_sizes
+def get_tools_from_db(session, coll_id, topic, tools_list):
+    # Only the bio_ids, the tool rows are loaded by get_tool_fragments for the fragments it rebuilds.
+    if tools_list:
+        split_list = tools_list.split(',')
+        bio_ids = {id.lower(): id for id in session.scalars(select(db.tools.bio_id).where(db.tools.bio_id.in_(split_list)))}
+        return [bio_ids[id.lower()] for id in split_list if id.lower() in bio_ids]
+    if coll_id:
+        # The column's collation is case-insensitive already, equality keeps ix_collection_ids_coll_id usable.
+        query = select(db.tools.bio_id).distinct().where(db.tools.bio_id == db.collection_ids.bio_id, db.collection_ids.coll_id == coll_id)
+    elif topic:
+        # A substring search, no index can serve the leading wildcard.
+        query = select(db.tools.bio_id).distinct().where(db.tools.bio_id == db.topics.bio_id, db.topics.term.ilike(f'%{topic}%'))
+    return list(session.scalars(query))
 
-def separate_tools_by_data_cycle_queries(serialized_tools):
-    separated_tools = {"acquisition": [], "data processing": [], "analysis": [], "storage": [], "share": [], "data management": [], "fair": []}
-    for tool in serialized_tools:
-        for data_cycle_query in tool['data_for_frontend']['data_cycle_queries']:
-            separated_tools[data_cycle_query['data_cycle_query']].append(tool)
-    result = []
-    result_sizes = []
-    for value in separated_tools.values():
-        result.append(value)
-        result_sizes.append(len(value))
-    return result, result_sizes
+def join_json(items):
+    return b'[' + b', '.join(items) + b']'
 
-def get_tools_from_db(coll_id, topic, tools_list):
-    result = []
+def create_query_document(coll_id, topic, tools_list):
+    # Both documents are spliced from the tool fragments.
+    # Version 1 is byte for byte what json.dumps returns for {"resulting_string", "data", "matrix_tools",
+    # "matrix_tools_sizes", "data_cycle_tools", "data_cycle_tools_sizes"}, every tool is repeated in its buckets.
+    # Version 2 stores every tool once in "tools", the buckets hold indices into it.
     with Session() as session:
-        if tools_list:
-            for tool in tools_list.split(','):
-                t = session.scalars(select(db.tools).where(db.tools.bio_id == tool)).first()
-                get_lists_for_tool(t)
-                result.append(t.serialize())
-            matrix_tools, matrix_tools_sizes = separate_tools_by_matrix_queries(result)
-            data_cycle_tools, data_cycle_tools_sizes = separate_tools_by_data_cycle_queries(result)
-            return result, matrix_tools, matrix_tools_sizes, data_cycle_tools, data_cycle_tools_sizes
-        
-        if coll_id:
-            query = select(db.tools).distinct().where(db.tools.bio_id == db.collection_ids.bio_id, db.collection_ids.coll_id.ilike(f'{coll_id}'))
-        elif topic:
-            query = select(db.tools).distinct().where(db.tools.bio_id == db.topics.bio_id, db.topics.term.ilike(f'%{topic}%'))
-        for tool in session.scalars(query):
-            get_lists_for_tool(tool)
-            result.append(tool.serialize())
-        matrix_tools, matrix_tools_sizes = separate_tools_by_matrix_queries(result)
-        data_cycle_tools, data_cycle_tools_sizes = separate_tools_by_data_cycle_queries(result)
-        return result, matrix_tools, matrix_tools_sizes, data_cycle_tools, data_cycle_tools_sizes
-    
\ No newline at end of file
+        bio_ids = get_tools_from_db(session, coll_id, topic, tools_list)
+        fragments = get_tool_fragments(session, bio_ids)
+        # Tools deleted since their bio_ids were read have no fragment.
+        bio_ids = [id for id in bio_ids if id in fragments]
+        matrix_tools = separate_tools_by_queries(session, bio_ids, db.matrix_queries, 'matrix_query', MATRIX_QUERIES)
+        data_cycle_tools = separate_tools_by_queries(session, bio_ids, db.data_cycle_queries, 'data_cycle_query', DATA_CYCLE_QUERIES)
+    resulting_string = json.dumps(create_display_string(coll_id, topic)).encode()
+    matrix_tools_sizes = json.dumps([len(ids) for ids in matrix_tools]).encode()
+    data_cycle_tools_sizes = json.dumps([len(ids) for ids in data_cycle_tools]).encode()
+    document = [
+        b'{"resulting_string": ', resulting_string,
+        b', "data": ', join_json(fragments[id] for id in bio_ids),
+        b', "matrix_tools": ', join_json(join_json(fragments[id] for id in ids) for ids in matrix_tools),
+        b', "matrix_tools_sizes": ', matrix_tools_sizes,
+        b', "data_cycle_tools": ', join_json(join_json(fragments[id] for id in ids) for ids in data_cycle_tools),
+        b', "data_cycle_tools_sizes": ', data_cycle_tools_sizes,
+        b'}'
+    ]
+    indices = {}
+    for id in bio_ids:
+        indices.setdefault(id, len(indices))
+    document_v2 = [
+        b'{"version": 2, "resulting_string": ', resulting_string,
+        b', "tools": ', join_json(fragments[id] for id in indices),
+        b', "matrix_tools": ', json.dumps([[indices[id] for id in ids] for ids in matrix_tools]).encode(),
+        b', "matrix_tools_sizes": ', matrix_tools_sizes,
+        b', "data_cycle_tools": ', json.dumps([[indices[id] for id in ids] for ids in data_cycle_tools]).encode(),
+        b', "data_cycle_tools_sizes": ', data_cycle_tools_sizes,
+        b'}'
+    ]
+    return b''.join(document), b''.join(document_v2), len(bio_ids)
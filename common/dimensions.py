@@ -0,0 +1,58 @@
+import asyncio
+import httpx
+from common.common_functions import get_years_from_cited_works
+from common.http_client import HTTP_TIMEOUT
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+DIMENSIONS_URL = 'https://badge.dimensions.ai/details'
+DIMENSIONS_CONCURRENCY = int(os.getenv('DIMENSIONS_CONCURRENCY', 8))
+
+async def fetch_json(client, semaphore, url):
+    # None means the request failed, an empty document is a valid answer.
+    try:
+        async with semaphore:
+            response = await client.get(url)
+        if response.status_code != 200:
+            return None
+        return response.json()
+    except Exception as e:
+        print(f'ERROR IN DIMENSIONS FETCH {url} {repr(e)}')
+        return None
+
+def get_cited_works_url(doi):
+    return f'{DIMENSIONS_URL}/doi/{doi}/cited_works.json?domain=https://bio.tools'
+
+async def fetch_publication(client, semaphore, identifier):
+    # With a DOI identifier metadata.json and cited_works.json are requested at the same time,
+    # a PMID needs the metadata first to learn the DOI.
+    doi = identifier.split('/', 1)[1] if identifier.startswith('doi/') else ''
+    metadata_request = fetch_json(client, semaphore, f'{DIMENSIONS_URL}/{identifier}/metadata.json?domain=https://bio.tools')
+    cited_works = None
+    if doi:
+        metadata, cited_works = await asyncio.gather(metadata_request, fetch_json(client, semaphore, get_cited_works_url(doi)))
+    else:
+        metadata = await metadata_request
+    if metadata is None:
+        return None
+    if not metadata:
+        return metadata, None
+    if metadata.get('doi') and metadata['doi'] != doi:
+        doi = metadata['doi']
+        cited_works = await fetch_json(client, semaphore, get_cited_works_url(doi))
+    years = None if not doi or not cited_works else get_years_from_cited_works(cited_works)
+    return metadata, years
+
+async def fetch_all(identifiers):
+    semaphore = asyncio.Semaphore(DIMENSIONS_CONCURRENCY)
+    limits = httpx.Limits(max_connections=DIMENSIONS_CONCURRENCY, max_keepalive_connections=DIMENSIONS_CONCURRENCY)
+    async with httpx.AsyncClient(timeout=HTTP_TIMEOUT, limits=limits) as client:
+        results = await asyncio.gather(*(fetch_publication(client, semaphore, identifier) for identifier in identifiers))
+    return {identifier: result for identifier, result in zip(identifiers, results) if result is not None}
+
+def fetch_publications(identifiers):
+    # Synchronous entry point for the ingestion code: {identifier: (metadata, years)} for every paper Dimensions answered for.
+    if not identifiers:
+        return {}
+    return asyncio.run(fetch_all(identifiers))
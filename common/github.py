@@ -0,0 +1,162 @@
+import common.http_client as http_client
+import threading
+import time
+import os
+from email.utils import parsedate_to_datetime
+from dotenv import load_dotenv
+
+load_dotenv()
+GITHUB_API_URL = os.getenv('GITHUB_API_URL', 'https://api.github.com')
+GITHUB_GRAPHQL_URL = os.getenv('GITHUB_GRAPHQL_URL', f'{GITHUB_API_URL}/graphql')
+GITHUB_GRAPHQL_BATCH = int(os.getenv('GITHUB_GRAPHQL_BATCH', 100))
+
+GITHUB_TOKENS = [token.strip() for token in os.getenv('GITHUB_TOKENS', os.getenv('GITHUB_TOKEN') or '').split(',') if token.strip()]
+# Wait after a rate-limited answer that says neither Retry-After nor a future X-RateLimit-Reset.
+GITHUB_RATE_LIMIT_WAIT = int(os.getenv('GITHUB_RATE_LIMIT_WAIT', 60))
+
+class TokenScheduler:
+    # Keeps the X-RateLimit-Remaining / X-RateLimit-Reset budget of every token per resource (REST "core", "graphql"),
+    # hands out the token with the largest budget and pauses the caller until the earliest reset once all are exhausted.
+
+    def __init__(self, tokens):
+        # Without tokens the unauthenticated requests share one bucket, tracked under None.
+        self.tokens = tokens or [None]
+        self.lock = threading.Lock()
+        self.buckets = {}
+
+    def acquire(self, resource):
+        while True:
+            with self.lock:
+                now = time.time()
+                best_token, best_remaining, next_reset = None, -1, None
+                for token in self.tokens:
+                    remaining, reset = self.buckets.get((token, resource), (None, 0))
+                    if remaining is None or reset <= now:
+                        remaining = float('inf')
+                    elif remaining <= 0:
+                        next_reset = reset if next_reset is None else min(next_reset, reset)
+                        continue
+                    if remaining > best_remaining:
+                        best_token, best_remaining = token, remaining
+                if best_remaining >= 0:
+                    return best_token
+            wait = max(next_reset - now, 0) + 1
+            print(f'GITHUB RATE LIMIT EXHAUSTED FOR {resource}, WAITING {round(wait)} SECONDS')
+            time.sleep(wait)
+
+    def update(self, token, resource, response):
+        remaining = response.headers.get('X-RateLimit-Remaining')
+        reset = response.headers.get('X-RateLimit-Reset')
+        if remaining is None or reset is None:
+            return
+        with self.lock:
+            self.buckets[(token, resource)] = (int(remaining), int(reset))
+
+    def exhaust(self, token, resource, seconds):
+        with self.lock:
+            self.buckets[(token, resource)] = (0, time.time() + seconds)
+
+scheduler = TokenScheduler(GITHUB_TOKENS)
+
+def is_rate_limited(response):
+    if response.status_code not in (403, 429):
+        return False
+    return response.headers.get('X-RateLimit-Remaining') == '0' or 'Retry-After' in response.headers
+
+def get_rate_limit_wait(response):
+    # Seconds until a rate-limited token may be used again. Retry-After is either seconds or an HTTP date.
+    now = time.time()
+    retry_after = response.headers.get('Retry-After')
+    if retry_after:
+        try:
+            return max(int(retry_after), 1)
+        except ValueError:
+            pass
+        try:
+            return max(parsedate_to_datetime(retry_after).timestamp() - now, 1)
+        except (TypeError, ValueError):
+            pass
+    reset = response.headers.get('X-RateLimit-Reset')
+    if reset and reset.isdigit() and int(reset) > now:
+        return int(reset) - now
+    return GITHUB_RATE_LIMIT_WAIT
+
+def request(send, url, resource, **kwargs):
+    # Rate-limited answers are not returned to the caller, the request is retried with the next token that has budget.
+    while True:
+        token = scheduler.acquire(resource)
+        headers = {'Authorization': 'token ' + token} if token else {}
+        response = send(url, headers=headers, **kwargs)
+        if getattr(response, 'from_cache', False):
+            return response
+        scheduler.update(token, resource, response)
+        if not is_rate_limited(response):
+            return response
+        scheduler.exhaust(token, resource, get_rate_limit_wait(response))
+
+def get(url, **kwargs):
+    return request(http_client.get, url, 'core', **kwargs)
+
+def post(url, **kwargs):
+    return request(http_client.post, url, 'graphql', **kwargs)
+
+def get_repository(link):
+    # Returns the repository url of a bio.tools link list and its (owner, repo), or None.
+    github_url = ""
+    for item in link:
+        if "Repository" in item["type"] and "github" in item["url"]:
+            github_url = item["url"]
+            break
+    if not github_url:
+        return None
+    github_url = github_url[:-1] if github_url[-1] == "/" else github_url
+    owner_and_repo = github_url.split("/")[-2:]
+    if owner_and_repo[0] == 'github.com':
+        return None
+    return github_url, tuple(owner_and_repo)
+
+def create_repositories_query(repositories):
+    # One aliased repository() field per repository, owners and names are passed as variables.
+    variables = {}
+    definitions = []
+    fields = []
+    for i, (owner, name) in enumerate(repositories):
+        variables[f'o{i}'] = owner
+        variables[f'n{i}'] = name
+        definitions.append(f'$o{i}: String!, $n{i}: String!')
+        fields.append(f'r{i}: repository(owner: $o{i}, name: $n{i}) {{ stargazerCount forkCount createdAt updatedAt }}')
+    query = f'query Repositories({", ".join(definitions)}) {{ {" ".join(fields)} }}'
+    return query, variables
+
+def fetch_repositories(repositories):
+    # Returns {(owner, repo): stats} for every repository GitHub answered for, stats is None for missing repositories.
+    # Repositories left out of the result (failed batch) fall back to the REST API.
+    result = {}
+    for start in range(0, len(repositories), GITHUB_GRAPHQL_BATCH):
+        batch = repositories[start:start + GITHUB_GRAPHQL_BATCH]
+        query, variables = create_repositories_query(batch)
+        try:
+            response = post(GITHUB_GRAPHQL_URL, json={'query': query, 'variables': variables})
+            if not response.ok:
+                print(f'ERROR IN FETCH REPOSITORIES {response.status_code}')
+                continue
+            data = response.json().get('data')
+            if not data:
+                print(f'ERROR IN FETCH REPOSITORIES {response.json().get("errors")}')
+                continue
+            for i, repository in enumerate(batch):
+                if f'r{i}' in data:
+                    result[repository] = data[f'r{i}']
+        except Exception as e:
+            print(f'ERROR IN FETCH REPOSITORIES {repr(e)}')
+    return result
+
+def prefetch_repositories(links):
+    repositories = []
+    for link in links:
+        repository = get_repository(link)
+        if repository and repository[1] not in repositories:
+            repositories.append(repository[1])
+    if not repositories:
+        return {}
+    return fetch_repositories(repositories)
@@ -0,0 +1,166 @@
+import atexit
+import sqlite3
+import threading
+import time
+import json
+import os
+from urllib.parse import urlsplit
+import requests
+from requests.structures import CaseInsensitiveDict
+from dotenv import load_dotenv
+
+load_dotenv()
+HTTP_CACHE_PATH = os.getenv('HTTP_CACHE_PATH', os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'cache', 'http_cache.sqlite'))
+HTTP_CACHE_MAX_BYTES = int(os.getenv('HTTP_CACHE_MAX_BYTES', 1024 * 1024 * 1024))
+EVICTION_INTERVAL = 100
+# Hits are written back as one batch of accessed_at updates per ACCESS_FLUSH_SIZE hits or ACCESS_FLUSH_SECONDS, so a hit stays a read.
+ACCESS_FLUSH_SIZE = 100
+ACCESS_FLUSH_SECONDS = 60
+# Seconds a response stays fresh, per upstream host. Hosts missing here are never cached.
+# HTTP_CACHE_TTLS="api.github.com=86400,bio.tools=0" overrides single hosts, 0 disables caching.
+DEFAULT_TTLS = {
+    'api.github.com': 24 * 3600,
+    'bio.tools': 6 * 3600,
+}
+SKIPPED_HEADERS = ['content-encoding', 'content-length', 'transfer-encoding', 'connection']
+
+def parse_ttls(value):
+    result = {}
+    for item in value.split(','):
+        if '=' not in item:
+            continue
+        host, ttl = item.split('=', 1)
+        result[host.strip()] = int(ttl)
+    return result
+
+TTLS = {**DEFAULT_TTLS, **parse_ttls(os.getenv('HTTP_CACHE_TTLS', ''))}
+local = threading.local()
+lock = threading.Lock()
+stores_since_eviction = 0
+# url -> time of its last hit not yet written to accessed_at
+accesses = {}
+accesses_flushed_at = time.time()
+
+def get_ttl(url):
+    return TTLS.get(urlsplit(url).hostname, 0)
+
+def get_connection():
+    # SQLite connections must not cross threads or forked processes.
+    if getattr(local, 'pid', None) != os.getpid():
+        os.makedirs(os.path.dirname(HTTP_CACHE_PATH), exist_ok=True)
+        connection = sqlite3.connect(HTTP_CACHE_PATH, timeout=30)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('CREATE TABLE IF NOT EXISTS responses (url TEXT PRIMARY KEY, status INTEGER, headers TEXT, body BLOB, size INTEGER, fetched_at REAL, accessed_at REAL)')
+        connection.execute('CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)')
+        connection.commit()
+        local.connection = connection
+        local.pid = os.getpid()
+    return local.connection
+
+def lookup(url):
+    try:
+        connection = get_connection()
+        row = connection.execute('SELECT status, headers, body, fetched_at FROM responses WHERE url = ?', (url,)).fetchone()
+        if not row:
+            return None
+        record_access(url)
+        return row
+    except Exception as e:
+        print(f'ERROR IN HTTP CACHE LOOKUP {repr(e)}')
+        return None
+
+def record_access(url):
+    with lock:
+        accesses[url] = time.time()
+        if len(accesses) < ACCESS_FLUSH_SIZE and time.time() - accesses_flushed_at < ACCESS_FLUSH_SECONDS:
+            return
+    flush_accesses()
+
+def flush_accesses(connection=None):
+    global accesses_flushed_at
+    with lock:
+        pending = [(accessed_at, url) for url, accessed_at in accesses.items()]
+        accesses.clear()
+        accesses_flushed_at = time.time()
+    if not pending:
+        return
+    try:
+        connection = connection or get_connection()
+        connection.executemany('UPDATE responses SET accessed_at = MAX(accessed_at, ?) WHERE url = ?', pending)
+        connection.commit()
+    except Exception as e:
+        print(f'ERROR IN HTTP CACHE FLUSH ACCESSES {repr(e)}')
+
+atexit.register(flush_accesses)
+
+def is_fresh(url, row):
+    return time.time() - row[3] < get_ttl(url)
+
+def get_validators(row):
+    # Expired entries are kept, their ETag / Last-Modified turn the next fetch into a conditional request.
+    headers = CaseInsensitiveDict(json.loads(row[1]))
+    validators = {}
+    if 'ETag' in headers:
+        validators['If-None-Match'] = headers['ETag']
+    if 'Last-Modified' in headers:
+        validators['If-Modified-Since'] = headers['Last-Modified']
+    return validators
+
+def revalidate(url, row, not_modified):
+    # A 304 keeps the stored body; its headers (rate limits, new validators) replace the stored ones.
+    headers = CaseInsensitiveDict(json.loads(row[1]))
+    headers.update({key: value for key, value in not_modified.headers.items() if key.lower() not in SKIPPED_HEADERS})
+    row = (row[0], json.dumps(dict(headers)), row[2], time.time())
+    try:
+        connection = get_connection()
+        connection.execute('UPDATE responses SET headers = ?, fetched_at = ? WHERE url = ?', (row[1], row[3], url))
+        connection.commit()
+    except Exception as e:
+        print(f'ERROR IN HTTP CACHE REVALIDATE {repr(e)}')
+    response = to_response(url, row)
+    response.from_cache = False
+    return response
+
+def store(url, response):
+    global stores_since_eviction
+    try:
+        headers = {key: value for key, value in response.headers.items() if key.lower() not in SKIPPED_HEADERS}
+        body = response.content
+        now = time.time()
+        connection = get_connection()
+        connection.execute('INSERT OR REPLACE INTO responses (url, status, headers, body, size, fetched_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?, ?)', (url, response.status_code, json.dumps(headers), body, len(body), now, now))
+        connection.commit()
+        with lock:
+            stores_since_eviction += 1
+            if stores_since_eviction < EVICTION_INTERVAL:
+                return
+            stores_since_eviction = 0
+        evict(connection)
+    except Exception as e:
+        print(f'ERROR IN HTTP CACHE STORE {repr(e)}')
+
+def evict(connection):
+    # Drops the least recently used responses until the cache fits into HTTP_CACHE_MAX_BYTES.
+    flush_accesses(connection)
+    total = connection.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+    if total <= HTTP_CACHE_MAX_BYTES:
+        return
+    excess = total - HTTP_CACHE_MAX_BYTES
+    urls = []
+    for url, size in connection.execute('SELECT url, size FROM responses ORDER BY accessed_at'):
+        if excess <= 0:
+            break
+        urls.append((url,))
+        excess -= size
+    connection.executemany('DELETE FROM responses WHERE url = ?', urls)
+    connection.commit()
+    print(f'HTTP CACHE EVICTED {len(urls)} RESPONSES')
+
+def to_response(url, row):
+    response = requests.Response()
+    response.url = url
+    response.status_code = row[0]
+    response.headers = CaseInsensitiveDict(json.loads(row[1]))
+    response._content = row[2]
+    response.from_cache = True
+    return response
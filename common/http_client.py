@@ -0,0 +1,47 @@
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import common.http_cache as http_cache
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+HTTP_TIMEOUT = float(os.getenv('HTTP_TIMEOUT', 30))
+HTTP_RETRIES = int(os.getenv('HTTP_RETRIES', 3))
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', 32))
+
+def create_session():
+    # One keep-alive connection pool per host (bio.tools, GitHub, Dimensions, OpenEBench, ...),
+    # each large enough for the enrichment pool. 429 and 5xx answers are retried with exponential backoff,
+    # POST is only used for read-only GitHub GraphQL queries.
+    retry = Retry(total=HTTP_RETRIES, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504], allowed_methods=['GET', 'POST'], respect_retry_after_header=True, raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=10, pool_maxsize=HTTP_POOL_SIZE, max_retries=retry)
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+session = create_session()
+
+def get(url, cache=True, **kwargs):
+    # Reads through the on-disk cache for hosts with a TTL (see common/http_cache.py).
+    # Stale entries are revalidated with If-None-Match / If-Modified-Since, GitHub does not count 304s against the quota.
+    kwargs.setdefault('timeout', HTTP_TIMEOUT)
+    ttl = http_cache.get_ttl(url) if cache else 0
+    row = None
+    if ttl:
+        row = http_cache.lookup(url)
+        if row and http_cache.is_fresh(url, row):
+            return http_cache.to_response(url, row)
+        if row:
+            kwargs['headers'] = {**(kwargs.get('headers') or {}), **http_cache.get_validators(row)}
+    response = session.get(url, **kwargs)
+    if row and response.status_code == 304:
+        return http_cache.revalidate(url, row, response)
+    if ttl and response.status_code == 200:
+        http_cache.store(url, response)
+    return response
+
+def post(url, **kwargs):
+    kwargs.setdefault('timeout', HTTP_TIMEOUT)
+    return session.post(url, **kwargs)
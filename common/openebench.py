@@ -0,0 +1,108 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy import select, delete
+import common.db as db
+import common.http_client as http_client
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+Session = sessionmaker(bind=db.engine, autoflush=False)
+OPENEBENCH_URL = 'https://openebench.bsc.es/monitor/rest'
+OPENEBENCH_CONCURRENCY = int(os.getenv('OPENEBENCH_CONCURRENCY', 8))
+OPENEBENCH_LINK_REFRESH_DAYS = float(os.getenv('OPENEBENCH_LINK_REFRESH_DAYS', 30))
+
+def resolve_link(id):
+    # Returns the monitor link of a tool, '' if OpenEBench does not know it.
+    response = http_client.get(f"{OPENEBENCH_URL}/aggregate?id={id.lower()}", timeout=5)
+    response.raise_for_status()
+    response = response.json()
+    if not response or "entities" not in response[0]:
+        return ''
+    entities = response[0]["entities"]
+    link = ""
+    for entity in entities:
+        if entity["type"] == "web":
+            link = entity["tools"][-1]["@id"]
+            break
+        elif entity["type"]:
+            link = entity["tools"][-1]["@id"]
+    return link
+
+def fetch_availability(link):
+    split_link = link.split("/")
+    response = http_client.get(f"{OPENEBENCH_URL}/homepage/{split_link[-3]}/{split_link[-2]}/{split_link[-1]}?limit=8")
+    response.raise_for_status()
+    response = response.json()
+    codes_200 = 0
+    for item in response:
+        if item["code"] == 200:
+            codes_200 += 1
+    return round(100 * (codes_200 / 8))
+
+def try_resolve_link(id):
+    try:
+        return resolve_link(id)
+    except Exception as e:
+        print(f'ERROR IN RESOLVE LINK {id} {repr(e)}')
+        return None
+
+def try_fetch_availability(link):
+    try:
+        return fetch_availability(link)
+    except Exception as e:
+        print(f'ERROR IN FETCH AVAILABILITY {link} {repr(e)}')
+        return None
+
+def get_stored_links(ids):
+    fresh_since = datetime.now() - timedelta(days=OPENEBENCH_LINK_REFRESH_DAYS)
+    with Session() as session:
+        query = select(db.availability_links).where(db.availability_links.bio_id.in_(ids), db.availability_links.resolved_at > fresh_since)
+        return {item.bio_id: item.link for item in session.scalars(query)}
+
+def store_links(links):
+    if not links:
+        return
+    with Session() as session:
+        for id, link in links.items():
+            session.merge(db.availability_links(bio_id=id, link=link, resolved_at=datetime.now()))
+        try:
+            session.commit()
+        except Exception as e:
+            print(f'ROLLING BACK IN STORE LINKS {repr(e)}')
+            session.rollback()
+
+def forget_links(ids):
+    # A stored link whose homepage checks fail is resolved again on the next run.
+    if not ids:
+        return
+    with Session() as session:
+        session.execute(delete(db.availability_links).where(db.availability_links.bio_id.in_(ids)))
+        session.commit()
+
+def get_link(id):
+    links = get_stored_links([id])
+    if id in links:
+        return links[id]
+    link = resolve_link(id)
+    store_links({id: link})
+    return link
+
+def prefetch_availability(ids):
+    # The aggregate endpoint only takes a single id, so the lookups of a batch run concurrently and their result is
+    # stored per tool. Returns {bio_id: availability}, None where OpenEBench has no answer.
+    try:
+        links = get_stored_links(ids)
+        missing = [id for id in ids if id not in links]
+        with ThreadPoolExecutor(max_workers=OPENEBENCH_CONCURRENCY) as executor:
+            resolved = {id: link for id, link in zip(missing, executor.map(try_resolve_link, missing)) if link is not None}
+            store_links(resolved)
+            links.update(resolved)
+            linked_ids = [id for id in ids if links.get(id)]
+            availabilities = dict(zip(linked_ids, executor.map(try_fetch_availability, [links[id] for id in linked_ids])))
+        forget_links([id for id in linked_ids if id not in resolved and availabilities[id] is None])
+        return {id: availabilities.get(id) for id in ids}
+    except Exception as e:
+        print(f'ERROR IN PREFETCH AVAILABILITY {repr(e)}')
+        return {}
@@ -0,0 +1,115 @@
+import json
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy import select
+import common.db as db
+import common.http_client as http_client
+import common.dimensions as dimensions
+from common.common_functions import get_years_for_graphs
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+Session = sessionmaker(bind=db.engine, autoflush=False)
+PUBLICATION_REFRESH_DAYS = float(os.getenv('PUBLICATION_REFRESH_DAYS', 1))
+identifier_locks = defaultdict(threading.Lock)
+identifier_locks_lock = threading.Lock()
+
+def get_identifier(doi, pmid):
+    # Dimensions metadata is stored once per paper, keyed the same way as its badge.dimensions.ai url.
+    if doi:
+        return f'doi/{doi}'
+    if pmid:
+        return f'pmid/{pmid}'
+    return None
+
+def get_publication_identifier(publication):
+    doi = '' if 'doi' not in publication or not publication['doi'] else publication['doi'].lower()
+    pmid = '' if 'pmid' not in publication or not publication['pmid'] else publication['pmid']
+    return get_identifier(doi, pmid)
+
+def fetch_publication(identifier):
+    response = http_client.get(f"https://badge.dimensions.ai/details/{identifier}/metadata.json?domain=https://bio.tools", cache=False)
+    if not response.ok:
+        return None
+    metadata = response.json()
+    years = None
+    doi = identifier.split('/', 1)[1] if identifier.startswith('doi/') else ''
+    doi = doi if not metadata or 'doi' not in metadata else metadata['doi']
+    if metadata and doi:
+        years = get_years_for_graphs(doi)
+    return metadata, years
+
+def load_publication(stored):
+    years = None if not stored.years else dict(json.loads(stored.years.decode('utf-8')))
+    return json.loads(stored.data.decode('utf-8')), years
+
+def get_publication(identifier):
+    # Returns (metadata, years for graphs) of a paper, fetched from Dimensions at most once per PUBLICATION_REFRESH_DAYS
+    # no matter how many tools cite it. None if Dimensions failed and nothing is stored yet.
+    with identifier_locks_lock:
+        lock = identifier_locks[identifier]
+    with lock:
+        with Session() as session:
+            stored = session.get(db.publication_metadata, identifier)
+            if stored and stored.fetched_at > datetime.now() - timedelta(days=PUBLICATION_REFRESH_DAYS):
+                return load_publication(stored)
+            stored_result = None if not stored else load_publication(stored)
+        # No connection is held while Dimensions answers.
+        result = fetch_publication(identifier)
+        if result is None:
+            return stored_result
+        with Session() as session:
+            store_publication(session, identifier, result, session.get(db.publication_metadata, identifier))
+            try:
+                session.commit()
+            except Exception as e:
+                print(f'ROLLING BACK IN GET PUBLICATION {repr(e)}')
+                session.rollback()
+        return result
+
+def store_publication(session, identifier, result, stored=None):
+    metadata, years = result
+    if not stored:
+        stored = db.publication_metadata(identifier=identifier)
+        session.add(stored)
+    stored.data = json.dumps(metadata).encode()
+    stored.times_cited = None if not metadata else metadata.get('times_cited')
+    stored.years = None if not years else json.dumps(list(years.items())).encode()
+    stored.fetched_at = datetime.now()
+
+def prefetch_publications(publication_lists):
+    # Fetches every stale paper of a batch of tools concurrently (common/dimensions.py) before the per-tool
+    # enrichment runs, which then only reads the store.
+    identifiers = []
+    for publications in publication_lists:
+        for publication in publications:
+            identifier = get_publication_identifier(publication)
+            if identifier and identifier not in identifiers:
+                identifiers.append(identifier)
+    if not identifiers:
+        return
+    try:
+        with Session() as session:
+            fresh_since = datetime.now() - timedelta(days=PUBLICATION_REFRESH_DAYS)
+            fetched_at = dict(session.execute(select(db.publication_metadata.identifier, db.publication_metadata.fetched_at).where(db.publication_metadata.identifier.in_(identifiers))).all())
+        stale = [identifier for identifier in identifiers if identifier not in fetched_at or fetched_at[identifier] <= fresh_since]
+        # No connection is held while Dimensions answers.
+        results = dimensions.fetch_publications(stale)
+    except Exception as e:
+        print(f'ERROR IN PREFETCH PUBLICATIONS {repr(e)}')
+        return
+    # Every paper is committed on its own, one that cannot be stored does not discard the others.
+    stored_count = 0
+    with Session() as session:
+        for identifier, result in results.items():
+            try:
+                store_publication(session, identifier, result, session.get(db.publication_metadata, identifier))
+                session.commit()
+                stored_count += 1
+            except Exception as e:
+                print(f'ROLLING BACK IN PREFETCH PUBLICATIONS {identifier} {repr(e)}')
+                session.rollback()
+    print(f'PREFETCHED {stored_count} OF {len(stale)} STALE PUBLICATIONS')
@@ -0,0 +1,57 @@
+import threading
+import time
+import os
+from collections import OrderedDict
+from dotenv import load_dotenv
+
+load_dotenv()
+QUERY_CACHE_MAX_BYTES = int(os.getenv('QUERY_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+# Seconds a query's stamp (data_hash, data_updated_at) is trusted before it is read from MySQL again.
+# Documents are written by the Celery worker and updatetools, which cannot reach the caches of the web workers.
+QUERY_CACHE_REVALIDATE_SECONDS = int(os.getenv('QUERY_CACHE_REVALIDATE_SECONDS', 30))
+# (query_id, column) -> [stamp, data, stored_at], least recently used first.
+entries = OrderedDict()
+lock = threading.Lock()
+size = 0
+
+def get_size(data):
+    return 0 if data is None else len(data)
+
+def lookup(key):
+    with lock:
+        entry = entries.get(key)
+        if entry:
+            entries.move_to_end(key)
+        return entry
+
+def is_fresh(entry):
+    return time.time() - entry[2] < QUERY_CACHE_REVALIDATE_SECONDS
+
+def store(key, stamp, data):
+    global size
+    with lock:
+        forget(key)
+        if get_size(data) > QUERY_CACHE_MAX_BYTES:
+            return
+        entries[key] = [stamp, data, time.time()]
+        size += get_size(data)
+        evict()
+
+def forget(key):
+    global size
+    entry = entries.pop(key, None)
+    if entry:
+        size -= get_size(entry[1])
+
+def invalidate(query_id):
+    # Drops every cached column of a query, for writers running in the same process as the cache.
+    with lock:
+        for key in [key for key in entries if key[0] == query_id]:
+            forget(key)
+
+def evict():
+    # Drops the least recently used documents until the cache fits into QUERY_CACHE_MAX_BYTES.
+    global size
+    while size > QUERY_CACHE_MAX_BYTES:
+        key, entry = entries.popitem(last=False)
+        size -= get_size(entry[1])
@@ -8,3 +8,8 @@ reload = True
 capture_output = True
 loglevel = "info"
 errorlog = "/var/log/biotoolssum/gunicorn_error.log"
+
+def post_fork(server, worker):
+    # Only needed with preload_app, otherwise the workers import the app after the fork anyway.
+    import common.db as db
+    db.dispose_after_fork()
@@ -0,0 +1,24 @@
+from logging.config import fileConfig
+from alembic import context
+import common.db as db
+
+if context.config.config_file_name:
+    fileConfig(context.config.config_file_name)
+
+def run_migrations_offline():
+    # alembic upgrade head --sql prints the statements instead of running them. The named paramstyle keeps
+    # literal % signs (DATE_FORMAT / STR_TO_DATE formats) from being doubled for the pymysql pyformat style.
+    context.configure(url=db.engine.url.render_as_string(hide_password=False), target_metadata=db.base.metadata, literal_binds=True, dialect_opts={'paramstyle': 'named'})
+    with context.begin_transaction():
+        context.run_migrations()
+
+def run_migrations_online():
+    with db.engine.connect() as connection:
+        context.configure(connection=connection, target_metadata=db.base.metadata)
+        with context.begin_transaction():
+            context.run_migrations()
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,122 @@
+"""Baseline, the schema base.metadata.create_all used to create
+
+Databases created before migrations existed are marked with
+    alembic stamp 0001
+and then brought up to date with alembic upgrade head.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+# (bio_id, name) tables
+NAME_TABLES = ['institutes', 'platforms', 'tool_types', 'elixir_platforms', 'elixir_nodes', 'elixir_communities']
+
+
+def upgrade():
+    op.create_table(
+        'tools',
+        sa.Column('bio_id', sa.String(255), primary_key=True),
+        sa.Column('name', sa.String(255)),
+        sa.Column('version', sa.String(255)),
+        sa.Column('homepage', sa.String(255)),
+        sa.Column('description', sa.String(5000)),
+        sa.Column('maturity', sa.String(255)),
+        sa.Column('license', sa.String(255)),
+        sa.Column('citation_count', sa.Integer),
+        sa.Column('availability', sa.String(255)),
+        sa.Column('github_url', sa.String(255)),
+        sa.Column('github_created_at', sa.String(255)),
+        sa.Column('github_updated_at', sa.String(255)),
+        sa.Column('github_forks', sa.Integer),
+        sa.Column('github_contributions', sa.Integer),
+        sa.Column('github_stars', sa.Integer),
+        sa.Column('last_updated', sa.String(255)),
+        sa.Column('options_for_graph', sa.LargeBinary),
+        sa.Column('data_for_frontend', sa.LargeBinary),
+    )
+    op.create_table(
+        'publications',
+        sa.Column('doi', sa.String(255), primary_key=True),
+        sa.Column('bio_id', sa.String(255), primary_key=True),
+        sa.Column('pmid', sa.String(255)),
+        sa.Column('title', sa.String(5000)),
+        sa.Column('authors', sa.String(7500)),
+        sa.Column('journal', sa.String(255)),
+        sa.Column('impact', sa.Float),
+        sa.Column('publication_date', sa.String(255)),
+        sa.Column('citations_count', sa.Integer),
+        sa.Column('citations_source', sa.String(255)),
+    )
+    op.create_table(
+        'functions',
+        sa.Column('function_id', sa.String(255), primary_key=True),
+        sa.Column('bio_id', sa.String(255), primary_key=True),
+        sa.Column('data_for_frontend', sa.LargeBinary),
+    )
+    op.create_table(
+        'operations',
+        sa.Column('function_id', sa.String(255), primary_key=True),
+        sa.Column('term', sa.String(255), primary_key=True),
+        sa.Column('uri', sa.String(255)),
+    )
+    for table in ['inputs', 'outputs']:
+        op.create_table(
+            table,
+            sa.Column('function_id', sa.String(255), primary_key=True),
+            sa.Column('term', sa.String(255), primary_key=True),
+        )
+    op.create_table(
+        'topics',
+        sa.Column('bio_id', sa.String(255), primary_key=True),
+        sa.Column('term', sa.String(255), primary_key=True),
+        sa.Column('uri', sa.String(255)),
+    )
+    for table in NAME_TABLES:
+        op.create_table(
+            table,
+            sa.Column('bio_id', sa.String(255), primary_key=True),
+            sa.Column('name', sa.String(255), primary_key=True),
+        )
+    op.create_table(
+        'collection_ids',
+        sa.Column('bio_id', sa.String(255), primary_key=True),
+        sa.Column('coll_id', sa.String(255), primary_key=True),
+    )
+    op.create_table(
+        'documentations',
+        sa.Column('bio_id', sa.String(255), primary_key=True),
+        sa.Column('url', sa.String(500), primary_key=True),
+        sa.Column('type', sa.String(255)),
+    )
+    op.create_table(
+        'queries',
+        sa.Column('id', sa.String(255), primary_key=True),
+        sa.Column('collection_id', sa.String(255)),
+        sa.Column('topic', sa.String(255)),
+        sa.Column('tools_list', sa.String(255)),
+        sa.Column('data', sa.LargeBinary(100000000)),
+    )
+    op.create_table(
+        'matrix_queries',
+        sa.Column('bio_id', sa.String(255), primary_key=True),
+        sa.Column('matrix_query', sa.String(255), primary_key=True),
+    )
+    op.create_table(
+        'data_cycle_queries',
+        sa.Column('bio_id', sa.String(255), primary_key=True),
+        sa.Column('data_cycle_query', sa.String(255), primary_key=True),
+    )
+
+
+def downgrade():
+    for table in ['data_cycle_queries', 'matrix_queries', 'queries', 'documentations', 'collection_ids'] + NAME_TABLES[::-1] + ['topics', 'outputs', 'inputs', 'operations', 'functions', 'publications', 'tools']:
+        op.drop_table(table)
@@ -0,0 +1,62 @@
+"""Publication and availability stores, tool fragments, stored query variants and lookup indexes
+
+Replaces the tables create_all added and utils/migrations/001-005.sql. Databases that already have all
+of them are marked with alembic stamp 0002 instead.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+QUERY_BLOBS = ['data_gzip', 'data_br', 'data_v2', 'data_v2_gzip', 'data_v2_br']
+INDEXES = [('ix_functions_bio_id', 'functions', 'bio_id'), ('ix_publications_bio_id', 'publications', 'bio_id'), ('ix_collection_ids_coll_id', 'collection_ids', 'coll_id')]
+
+
+def upgrade():
+    op.create_table(
+        'publication_metadata',
+        sa.Column('identifier', sa.String(255), primary_key=True),
+        sa.Column('data', sa.LargeBinary(16000000)),
+        sa.Column('times_cited', sa.Integer),
+        sa.Column('years', sa.LargeBinary(16000000)),
+        sa.Column('fetched_at', sa.DateTime),
+    )
+    op.create_table(
+        'availability_links',
+        sa.Column('bio_id', sa.String(255), primary_key=True),
+        sa.Column('link', sa.String(500)),
+        sa.Column('resolved_at', sa.DateTime),
+    )
+    op.create_table(
+        'tool_fragments',
+        sa.Column('bio_id', sa.String(255), primary_key=True),
+        sa.Column('data', sa.LargeBinary(16000000)),
+        sa.Column('data_hash', sa.String(64)),
+        sa.Column('dirty', sa.Boolean),
+    )
+    op.add_column('queries', sa.Column('data_hash', sa.String(64)))
+    op.add_column('queries', sa.Column('data_updated_at', sa.DateTime))
+    for column in QUERY_BLOBS:
+        op.add_column('queries', sa.Column(column, sa.LargeBinary(100000000)))
+    for name, table, column in INDEXES:
+        op.create_index(name, table, [column])
+
+
+def downgrade():
+    for name, table, column in INDEXES:
+        op.drop_index(name, table_name=table)
+    for column in QUERY_BLOBS[::-1]:
+        op.drop_column('queries', column)
+    op.drop_column('queries', 'data_updated_at')
+    op.drop_column('queries', 'data_hash')
+    op.drop_table('tool_fragments')
+    op.drop_table('availability_links')
+    op.drop_table('publication_metadata')
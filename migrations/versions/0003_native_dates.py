@@ -0,0 +1,59 @@
+"""Native DATE columns for tools.last_updated, the GitHub dates and publications.publication_date
+
+Empty strings become NULL. Any other value that does not have the expected string format stops the
+migration, see check_values.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+# (table, column, stored string format, MySQL regular expression of that format)
+COLUMNS = [
+    ('tools', 'last_updated', '%m/%d/%Y', '^[0-9]{2}/[0-9]{2}/[0-9]{4}$'),
+    ('tools', 'github_created_at', '%Y-%m-%d', '^[0-9]{4}-[0-9]{2}-[0-9]{2}$'),
+    ('tools', 'github_updated_at', '%Y-%m-%d', '^[0-9]{4}-[0-9]{2}-[0-9]{2}$'),
+    ('publications', 'publication_date', '%Y-%m-%d', '^[0-9]{4}-[0-9]{2}-[0-9]{2}$'),
+]
+
+
+def check_values(table, column, pattern):
+    # Only empty strings may become NULL. Anything else that does not match its format stops the migration
+    # instead of being dropped, it has to be fixed or cleared by hand first.
+    if context.is_offline_mode():
+        print(f'-- Check before applying: non-empty {table}.{column} values not matching {pattern} become NULL')
+        return
+    rows = op.get_bind().execute(sa.text(f"SELECT {column} FROM {table} WHERE {column} <> '' AND {column} NOT REGEXP :pattern").bindparams(pattern=pattern)).fetchall()
+    if rows:
+        samples = ', '.join(repr(row[0]) for row in rows[:5])
+        raise RuntimeError(f'{len(rows)} values of {table}.{column} do not match {pattern}, e.g. {samples}')
+
+
+def convert(table, column, new_type, expression, **params):
+    # Through a temporary column, so every value is converted explicitly instead of relying on MySQL's casts.
+    op.add_column(table, sa.Column(f'{column}_converted', new_type))
+    op.execute(sa.text(f'UPDATE {table} SET {column}_converted = {expression}').bindparams(**params))
+    op.drop_column(table, column)
+    op.alter_column(table, f'{column}_converted', new_column_name=column, existing_type=new_type)
+
+
+def upgrade():
+    for table, column, format, pattern in COLUMNS:
+        check_values(table, column, pattern)
+    for table, column, format, pattern in COLUMNS:
+        convert(table, column, sa.Date, f'IF({column} REGEXP :pattern, STR_TO_DATE({column}, :format), NULL)', pattern=pattern, format=format)
+    op.create_index('ix_tools_last_updated', 'tools', ['last_updated'])
+
+
+def downgrade():
+    op.drop_index('ix_tools_last_updated', table_name='tools')
+    for table, column, format, pattern in COLUMNS:
+        convert(table, column, sa.String(255), f'DATE_FORMAT({column}, :format)', format=format)
@@ -0,0 +1,22 @@
+"""Generation counter of tool_fragments, so a rebuilt fragment is only stored if its tool was not written meanwhile
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('tool_fragments', sa.Column('generation', sa.Integer, nullable=False, server_default='0'))
+
+
+def downgrade():
+    op.drop_column('tool_fragments', 'generation')
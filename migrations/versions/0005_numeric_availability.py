@@ -0,0 +1,45 @@
+"""Integer column for tools.availability, the OpenEBench percentage that was stored as a string
+
+Empty strings become NULL. Any other value that is not a whole number stops the migration.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+PATTERN = '^[0-9]+$'
+
+
+def check_values():
+    if context.is_offline_mode():
+        print(f"-- Check before applying: non-empty tools.availability values not matching {PATTERN} become NULL")
+        return
+    rows = op.get_bind().execute(sa.text("SELECT availability FROM tools WHERE availability <> '' AND availability NOT REGEXP :pattern").bindparams(pattern=PATTERN)).fetchall()
+    if rows:
+        samples = ', '.join(repr(row[0]) for row in rows[:5])
+        raise RuntimeError(f'{len(rows)} values of tools.availability do not match {PATTERN}, e.g. {samples}')
+
+
+def convert(new_type, expression, **params):
+    # Through a temporary column like 0003, so every value is converted explicitly.
+    op.add_column('tools', sa.Column('availability_converted', new_type))
+    op.execute(sa.text(f'UPDATE tools SET availability_converted = {expression}').bindparams(**params))
+    op.drop_column('tools', 'availability')
+    op.alter_column('tools', 'availability_converted', new_column_name='availability', existing_type=new_type)
+
+
+def upgrade():
+    check_values()
+    convert(sa.Integer, 'IF(availability REGEXP :pattern, CAST(availability AS UNSIGNED), NULL)', pattern=PATTERN)
+
+
+def downgrade():
+    convert(sa.String(255), 'CAST(availability AS CHAR)')
@@ -1,16 +1,19 @@
-import requests
 import common.db as db
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, defer
 from sqlalchemy import select
-import math
-from common.common_functions import update_version, update_availability, update_github_info, get_years_for_graphs, create_options_for_graphs, create_display_string, get_tools_from_db
-from datetime import date, datetime
+from common.common_functions import update_version, update_availability, update_github_info, create_options_for_graphs, parse_date, create_query_document, get_data_hash, store_query_data, mark_fragments_dirty, add_queries_matrix_data_cycle_from_items, get_items_from_pages, get_items_from_list, get_chunks, enrichment_pool, PREFETCH_BATCH
+from common.github import prefetch_repositories
+from common.openebench import prefetch_availability
+from common.publications import get_identifier, get_publication, prefetch_publications
+from datetime import date, timedelta
 from common.wos import impacts
 from flaskapp import add_tool
-import json
 import os
 
 Session = sessionmaker(bind=db.engine, autoflush=False)
+UPDATE_INTERVAL_DAYS = int(os.getenv('UPDATE_INTERVAL_DAYS', 1))
+# Tools refreshed within UPDATE_INTERVAL_DAYS, filled by update_tools() and by every tool updated during the run.
+fresh_tools = set()
 
 def update_tooltypes(tooltypes, id):
     tooltypes = list(set(tooltypes))
@@ -253,16 +256,15 @@ def update_publications_and_years(publications, id):
             for publication in publications:
                 doi = '' if 'doi' not in publication or not publication['doi'] else publication['doi'].lower()
                 pmid = '' if 'pmid' not in publication or not publication['pmid'] else publication['pmid']
-                if doi:
-                    response = requests.get(f"https://badge.dimensions.ai/details/doi/{doi}/metadata.json?domain=https://bio.tools")
-                elif pmid:
-                    response = requests.get(f"https://badge.dimensions.ai/details/pmid/{pmid}/metadata.json?domain=https://bio.tools")
-                else:
+                identifier = get_identifier(doi, pmid)
+                if not identifier:
                     print(f'NOT DOI NOR PMID')
                     continue
-                if not response.ok:
+                publication_data = get_publication(identifier)
+                if not publication_data:
                     continue
-                if not response.json():
+                response, years = publication_data
+                if not response:
                     if not doi or doi in used_doi:
                         print(f'DOI MISSING {id} OR DUPLICATE DOI')
                         continue
@@ -272,7 +274,6 @@ def update_publications_and_years(publications, id):
                     session.add(db.publications(bio_id=id, doi=doi))
                     used_doi.append(doi)
                     continue
-                response = response.json()
                 doi = doi if 'doi' not in response else response['doi']
                 if not doi or doi in used_doi:
                     print(f"PUB DOI MISSING {id} OR DUPLICATE DOI")
@@ -288,7 +289,7 @@ def update_publications_and_years(publications, id):
                 if existing_publication:
                     print(f'UPDATING PUBLICATION {doi}, CITATIONS COUNT BEFORE: {existing_publication.citations_count} AFTER: {pub_citations_count}')
                     existing_publication.citations_count = pub_citations_count
-                    years_for_graphs[existing_publication.title] = get_years_for_graphs(existing_publication.doi)
+                    years_for_graphs[existing_publication.title] = years
                     continue
                 badge_dimensions_id = '' if 'id' not in response else response['id']
                 citations_source = f"https://badge.dimensions.ai/details/id/{badge_dimensions_id}/citations"
@@ -296,9 +297,9 @@ def update_publications_and_years(publications, id):
                 date = '' if 'date' not in response else response['date']
                 pmid = '' if 'pmid' not in response else response['pmid']
                 title = '' if 'title' not in response else response['title']
-                years_for_graphs[title] = get_years_for_graphs(doi)
+                years_for_graphs[title] = years
                 print(f"ADDING NEW PUBLICATION {doi}")
-                session.add(db.publications(doi=doi, bio_id=id, pmid=pmid, title=title, authors=authors[:7500], journal=journal, impact=round(impact, 3), publication_date=date, citations_count=pub_citations_count, citations_source=citations_source))
+                session.add(db.publications(doi=doi, bio_id=id, pmid=pmid, title=title, authors=authors[:7500], journal=journal, impact=round(impact, 3), publication_date=parse_date(date), citations_count=pub_citations_count, citations_source=citations_source))
             session.commit()
             return tool_citations_count, years_for_graphs
     except Exception as e:
@@ -306,36 +307,6 @@ def update_publications_and_years(publications, id):
         session.rollback()
         return 0, None
 
-def add_queries_matrix_data_cycle(id):
-    matrix_queries = ['dna sequence', 'dna secondary structure', 'dna structure', 'genomics', 'rna sequence', 'rna secondary structure', 'rna structure', 'rna omics', 'protein sequence', 'protein secondary structure', 'protein structure', 'protein omics', 'small molecule primary sequence', 'small molecule secondary structure', 'small molecule structure', 'small molecule omics']
-    data_cycle_queries = ['acquisition', 'data processing', 'analysis', 'storage', 'share', 'data management', 'fair']
-    with Session() as session:
-        for query in matrix_queries:
-            if bool(session.query(db.matrix_queries).filter_by(bio_id=id, matrix_query=query).first()):
-                continue
-            response = requests.get(f'https://bio.tools/api/tool/?page=1&q={query}&biotoolsID=\"{id}\"&format=json')
-            if not response.ok:
-                return
-            response = response.json()
-            if response['count'] < 1:
-                continue
-            session.add(db.matrix_queries(bio_id=id, matrix_query=query))
-        for query in data_cycle_queries:
-            if bool(session.query(db.data_cycle_queries).filter_by(bio_id=id, data_cycle_query=query).first()):
-                continue
-            response = requests.get(f'https://bio.tools/api/tool/?page=1&q={query}&biotoolsID=\"{id}\"&format=json')
-            if not response.ok:
-                return
-            response = response.json()
-            if response['count'] < 1:
-                continue
-            session.add(db.data_cycle_queries(bio_id=id, data_cycle_query=query))
-        try:
-            session.commit()
-        except Exception as e:
-            print(f'ROLLING BACK IN MATRIX QUERIES {repr(e)}')
-            session.rollback()
-
 def check_for_broken_tool(id):
     tables = [db.tool_types, db.institutes, db.topics, db.platforms, db.collection_ids, db.documentations, db.elixir_communities, db.elixir_nodes, db.elixir_platforms, db.publications, db.matrix_queries, db.data_cycle_queries]
     with Session() as session:
@@ -353,25 +324,26 @@ def check_for_broken_tool(id):
                 session.delete(item)
         session.commit()
         
-def update_tool(item, id):
+def get_fresh_tools():
+    # A range scan on ix_tools_last_updated instead of parsing last_updated of every tool.
+    since = date.today() - timedelta(days=UPDATE_INTERVAL_DAYS)
+    with Session() as session:
+        return set(session.scalars(select(db.tools.bio_id).where(db.tools.last_updated > since)))
+
+def update_tool(item, id, repositories=None, availabilities=None):
+    if id in fresh_tools:
+        print(f'TOOL {id} HAS BEEN UPDATED ALREADY')
+        return
+    fresh_tools.add(id)
     with Session() as session:
         tool = session.scalars(select(db.tools).where(db.tools.bio_id == id)).first()
         if not tool:
+            # New tools are inserted atomically, this only clears rows left behind by older imports.
             check_for_broken_tool(id)
             print(f"ADDING A BRAND NEW TOOL {id}")
-            tool = add_tool(item, id)
-            if tool:
-                try:
-                    session.add(tool)
-                    session.commit()
-                    add_queries_matrix_data_cycle(id)
-                except Exception as e:
-                    print(f"ROLLBACK IN ADDING A NEW TOOL {id} {repr(e)}")
-                    session.rollback()
-            return
-        tool_last_update = datetime.strptime(tool.last_updated, "%m/%d/%Y")
-        if (tool_last_update.day == date.today().day):
-            print(f'TOOL {id} HAS BEEN UPDATED TODAY ALREADY')
+            if add_tool(item, id, repositories, availabilities):
+                add_queries_matrix_data_cycle_from_items([item])
+            mark_fragments_dirty([id])
             return
         print(f'UPDATING TOOL {id}')
         tool.name = item["name"]
@@ -380,10 +352,13 @@ def update_tool(item, id):
         tool.maturity = item["maturity"]
         tool.license = item["license"]
         tool.version = update_version(item["version"])
-        availability = update_availability(id)
-        if availability:
+        availability_future = enrichment_pool.submit(update_availability, id, availabilities)
+        github_future = enrichment_pool.submit(update_github_info, item['link'], repositories)
+        citation_count, years_for_graphs = update_publications_and_years(item['publication'], id)
+        availability = availability_future.result()
+        if availability is not None:
             tool.availability = availability
-        url, created_at, updated_at, forks, contributions, stars = update_github_info(item['link'])
+        url, created_at, updated_at, forks, contributions, stars = github_future.result()
         if url:
             tool.github_url = url
         if created_at:
@@ -396,8 +371,7 @@ def update_tool(item, id):
             tool.github_contributions = contributions
         if stars:
             tool.github_stars = stars
-        tool.last_updated = (date.today()).strftime("%m/%d/%Y")
-        citation_count, years_for_graphs = update_publications_and_years(item['publication'], id)
+        tool.last_updated = date.today()
         if citation_count >= tool.citation_count:
             tool.citation_count = citation_count
         options_for_graph = create_options_for_graphs(tool.name, years_for_graphs)
@@ -417,32 +391,39 @@ def update_tool(item, id):
         except Exception as e:
             print(f'ROLLING BACK IN UPDATE TOOLS {repr(e)}')
             session.rollback()
+    mark_fragments_dirty([id])
+
+def update_tools_from_items(items, query_id):
+    for chunk in get_chunks(items, PREFETCH_BATCH):
+        if None in chunk:
+            return
+        chunk = [item for item in chunk if item['biotoolsID'] not in fresh_tools]
+        if not chunk:
+            continue
+        repositories = enrichment_pool.submit(prefetch_repositories, [item['link'] for item in chunk])
+        availabilities = enrichment_pool.submit(prefetch_availability, [item['biotoolsID'] for item in chunk])
+        prefetch_publications([item['publication'] for item in chunk])
+        repositories, availabilities = repositories.result(), availabilities.result()
+        for item in chunk:
+            update_tool(item, item['biotoolsID'], repositories, availabilities)
+    update_json(query_id)
 
 def update_tools_from_given_list(tools_list, query_id):
     split_list = tools_list.split(',')
     if not split_list or split_list[0] == '':
         return
-    for t in split_list:
-        response = requests.get(f'https://bio.tools/api/tool/?&biotoolsID=\"{t}\"&format=json')
-        if not response.ok:
-            return
-        response = response.json()
-        if not response['list']:
-            continue
-        item = response['list'][0]
-        id = item['biotoolsID']
-        update_tool(item, id)
-    update_json(query_id)
+    update_tools_from_items(get_items_from_list(split_list), query_id)
 
 def update_json(query_id):
     with Session() as session:
-        query = session.scalars(select(db.queries).where(db.queries.id == query_id)).first()
-        result, matrix_tools, matrix_tools_sizes, data_cycle_tools, data_cycle_tools_sizes = get_tools_from_db(query.collection_id, query.topic, query.tools_list)
-        print(f'TOOLS FROM DB: {len(result)}')
-        resulting_string = create_display_string(query.collection_id, query.topic)
-        data = {"resulting_string": resulting_string, "data": result, "matrix_tools": matrix_tools, "matrix_tools_sizes": matrix_tools_sizes, "data_cycle_tools": data_cycle_tools, "data_cycle_tools_sizes": data_cycle_tools_sizes}
-        json_data = json.dumps(data)
-        query.data = json_data.encode()
+        query = session.scalars(select(db.queries).where(db.queries.id == query_id).options(defer(db.queries.data))).first()
+        data, data_v2, tools_count = create_query_document(query.collection_id, query.topic, query.tools_list)
+        print(f'TOOLS FROM DB: {tools_count}')
+        data_hash = get_data_hash(data)
+        if query.data_hash == data_hash:
+            print('JSON UNCHANGED')
+            return
+        store_query_data(query, data, data_v2)
         try:
             print('UPDATING JSON')
             session.commit()
@@ -456,20 +437,7 @@ def update_tools_from_api(coll_id, topic, tools_list, query_id):
     if not coll_id and not topic:
         update_tools_from_given_list(tools_list, query_id)
         return
-    response = requests.get(f'https://bio.tools/api/tool/?{coll_id}{topic}&format=json')
-    if not response.ok:
-        return
-    response = response.json()
-    count = math.ceil(response['count'] / 10) + 1
-    for i in range(1, count):
-        response = requests.get(f'https://bio.tools/api/tool/?page={i}{coll_id}{topic}&format=json')
-        if not response.ok:
-            return
-        response = response.json()
-        for item in response['list']:
-            id = item['biotoolsID']
-            update_tool(item, id)
-    update_json(query_id)
+    update_tools_from_items(get_items_from_pages(coll_id, topic), query_id)
 
 def check_for_duplicate_queries():
     with Session() as session:
@@ -503,6 +471,8 @@ def check_for_duplicate_queries():
 
 def update_tools():
     check_for_duplicate_queries()
+    fresh_tools.update(get_fresh_tools())
+    print(f'TOOLS UPDATED IN THE LAST {UPDATE_INTERVAL_DAYS} DAYS {len(fresh_tools)}')
     with Session() as session:
         print(f'DATE OF UPDATE {date.today()}')
         queries = session.scalars(select(db.queries))
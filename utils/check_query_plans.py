@@ -0,0 +1,41 @@
+import sys
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session
+import common.db as db
+from common.common_functions import TOOL_LIST_TABLES
+
+def get_sample(session, column):
+    return [row[0] for row in session.execute(select(column).limit(2))] or ['']
+
+def get_statements(session):
+    bio_ids = get_sample(session, db.tools.bio_id)
+    function_ids = get_sample(session, db.functions.function_id)
+    coll_id = get_sample(session, db.collection_ids.coll_id)[0]
+    for table in TOOL_LIST_TABLES + [db.functions]:
+        yield table.__tablename__, select(table).where(table.bio_id.in_(bio_ids))
+    for table in [db.operations, db.inputs, db.outputs]:
+        yield table.__tablename__, select(table).where(table.function_id.in_(function_ids))
+    yield 'tools', select(db.tools).where(db.tools.bio_id.in_(bio_ids))
+    yield 'tools by collection', select(db.tools.bio_id).distinct().where(db.tools.bio_id == db.collection_ids.bio_id, db.collection_ids.coll_id == coll_id)
+    yield 'tool_fragments', select(db.tool_fragments).where(db.tool_fragments.bio_id.in_(bio_ids))
+
+def check_query_plans():
+    # EXPLAINs the lookups of the query materialization, returns how many of them can only scan a whole table.
+    failures = 0
+    with db.engine.connect() as connection:
+        with Session(bind=connection) as session:
+            statements = list(get_statements(session))
+        for name, statement in statements:
+            sql = str(statement.compile(dialect=db.engine.dialect, compile_kwargs={'literal_binds': True}))
+            for row in connection.execute(text(f'EXPLAIN {sql}')).mappings():
+                # On small tables MySQL may still prefer a scan, only a scan without any usable index is a failure.
+                if row['type'] == 'ALL' and not row['possible_keys']:
+                    failures += 1
+                    print(f'FULL SCAN IN {name} ON {row["table"]}')
+                else:
+                    print(f'OK {name} ON {row["table"]} ({row["type"]}, {row["key"]})')
+    return failures
+
+if __name__ == "__main__":
+    # python -m utils.check_query_plans, exits with 1 if a lookup lost its index.
+    sys.exit(1 if check_query_plans() else 0)
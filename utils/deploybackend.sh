@@ -13,7 +13,7 @@ yes | sudo apt install python3-pip python3-dev build-essential libssl-dev libffi
 python3 -m venv /home/$CURRENT_USER/biotoolssum-backend/venv
 
 source /home/$CURRENT_USER/biotoolssum-backend/venv/bin/activate
-pip install wheel flask gunicorn requests sqlalchemy flask_cors celery pymysql cryptography python-dotenv
+pip install wheel flask gunicorn requests sqlalchemy flask_cors celery pymysql cryptography python-dotenv httpx brotli alembic
 deactivate
 
 # SETTING UP LOG FILES
@@ -90,6 +90,10 @@ FLUSH PRIVILEGES;
 CREATE DATABASE biotoolssumDB;
 EOF
 
+# CREATING AND UPGRADING THE SCHEMA (A DATABASE CREATED BEFORE MIGRATIONS EXISTED NEEDS "alembic stamp 0001" FIRST)
+
+(cd /home/$CURRENT_USER/biotoolssum-backend && venv/bin/alembic upgrade head)
+
 # SETTING UP FLASKAPP SERVICE (GUNICORN)
 
 sudo touch /etc/systemd/system/flaskapp.service
@@ -105,6 +109,7 @@ User=$CURRENT_USER
 Group=www-data
 WorkingDirectory=/home/$CURRENT_USER/biotoolssum-backend
 Environment="PATH=/home/$CURRENT_USER/biotoolssum-backend/venv/bin"
+Environment="BIOTOOLSSUM_PROCESS=web"
 ExecStart=/home/$CURRENT_USER/biotoolssum-backend/venv/bin/gunicorn -c /home/$CURRENT_USER/biotoolssum-backend/gunicorn/gunicorn_conf.py wsgi:app
 
 [Install]
@@ -116,6 +121,13 @@ sudo systemctl enable flaskapp.service
 
 # SETTING UP RABBIT-MQ AND CELERY SERVICE
 
+# MYSQL CONNECTIONS (common/db.py POOL_PROFILES, ENRICHMENT_WORKERS DEFAULTS TO 16), AT MOST:
+#   GUNICORN      workers (2) x (2 + 3)                                   = 10
+#   CELERY        CELERY_CONCURRENCY (2) x 2 x ENRICHMENT_WORKERS         = 64
+#   UPDATETOOLS   2 x ENRICHMENT_WORKERS                                  = 32
+# 106 IN TOTAL, BELOW MYSQL'S DEFAULT max_connections OF 151. RAISE max_connections BEFORE RAISING ANY OF THESE.
+CELERY_CONCURRENCY=${CELERY_CONCURRENCY:-2}
+
 echo "USERNAME_RABBIT=$USERNAME_RABBIT" | sudo tee -a /home/$CURRENT_USER/biotoolssum-backend/.env
 echo "PASSWORD_RABBIT=$PASSWORD_RABBIT" | sudo tee -a /home/$CURRENT_USER/biotoolssum-backend/.env
 echo "VHOST_RABBIT=$VHOST_RABBIT" | sudo tee -a /home/$CURRENT_USER/biotoolssum-backend/.env
@@ -141,7 +153,8 @@ User=$CURRENT_USER
 Group=www-data
 WorkingDirectory=/home/$CURRENT_USER/biotoolssum-backend
 Environment="PATH=/home/$CURRENT_USER/biotoolssum-backend/venv/bin"
-ExecStart=/home/$CURRENT_USER/biotoolssum-backend/venv/bin/celery -A flaskapp.celery worker --logfile=/var/log/biotoolssum/celery.log --loglevel=INFO
+Environment="BIOTOOLSSUM_PROCESS=worker"
+ExecStart=/home/$CURRENT_USER/biotoolssum-backend/venv/bin/celery -A flaskapp.celery worker --concurrency=$CELERY_CONCURRENCY --logfile=/var/log/biotoolssum/celery.log --loglevel=INFO
 
 [Install]
 WantedBy=multi-user.target
@@ -179,7 +192,7 @@ sudo systemctl restart nginx
 # SETTING UP A CRON JOB FOR UPDATING TOOLS
 
 echo "MAILTO=\"\"" | sudo tee -a /tmp/cronjob
-echo "0 0 */3 * * /home/$CURRENT_USER/biotoolssum-backend/venv/bin/python3 /home/$CURRENT_USER/biotoolssum-backend/updatetools.py >> /var/log/biotoolssum/updatetools.log 2>&1" | sudo tee -a /tmp/cronjob
+echo "0 0 */3 * * BIOTOOLSSUM_PROCESS=update /home/$CURRENT_USER/biotoolssum-backend/venv/bin/python3 /home/$CURRENT_USER/biotoolssum-backend/updatetools.py >> /var/log/biotoolssum/updatetools.log 2>&1" | sudo tee -a /tmp/cronjob
 cat /tmp/cronjob
 crontab /tmp/cronjob
 sudo rm /tmp/cronjob